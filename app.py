@@ -2,6 +2,7 @@
 
 import atexit
 import logging
+from functools import partial
 
 from flask import Flask
 from flask_socketio import SocketIO
@@ -11,6 +12,8 @@ from modules.config import load_server_config, load_upload_config
 from modules.routes import register_routes
 from modules.sockets import register_socket_handlers
 from modules.state import AppState
+from modules.upload_service import remove_stored_file
+from modules.upload_storage import configure_buffer_pool
 
 logger = logging.getLogger(__name__)
 
@@ -25,7 +28,11 @@ def create_socketio_app(
 
     upload_config = load_upload_config()
     server_config = load_server_config()
-    state = AppState()
+    state = AppState(
+        max_messages=server_config.message_max_history,
+        max_uploaded_files=upload_config.max_stored_files,
+    )
+    state.uploaded_files.on_evict = partial(remove_stored_file, upload_config)
 
     # 初始化下载队列管理器（使用配置中的max_concurrent_downloads）
     download_manager = state.get_download_manager()
@@ -37,8 +44,12 @@ def create_socketio_app(
         server_config.download_config.enable_queue
     )
 
+    # Pinned rather than auto-detected: the upload/download queues block on
+    # threading primitives and nothing is monkey-patched, so an installed
+    # eventlet/gevent would otherwise be picked up and stall its hub.
     socketio = SocketIO(
         app,
+        async_mode="threading",
         cors_allowed_origins=server_config.socketio_cors_allowed_origins,
         ping_interval=server_config.socketio_ping_interval,
         ping_timeout=server_config.socketio_ping_timeout,
@@ -46,6 +57,7 @@ def create_socketio_app(
 
     upload_config.upload_dir.mkdir(parents=True, exist_ok=True)
     upload_config.chunk_dir.mkdir(parents=True, exist_ok=True)
+    configure_buffer_pool(upload_config.max_concurrency * 2)
 
     if run_startup_cleanup:
         clean_upload_dirs(upload_config)
@@ -62,7 +74,7 @@ def create_socketio_app(
         state,
         server_config.client_log,
     )
-    register_socket_handlers(socketio, state)
+    register_socket_handlers(socketio, state, history_limit=server_config.socketio_history_limit)
 
     app.extensions["myfilehelper"] = {
         "upload_config": upload_config,
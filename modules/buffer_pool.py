@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+
+class BufferPool:
+    """LIFO pool of reusable I/O buffers shared by concurrent uploads."""
+
+    def __init__(self, buffer_size: int, max_buffers: int, idle_seconds: float = 30.0) -> None:
+        self.buffer_size = int(buffer_size)
+        self.max_buffers = max(1, int(max_buffers))
+        self.idle_seconds = idle_seconds
+        # LIFO hands out the most recently used buffer, whose pages are still resident.
+        self._buffers: queue.LifoQueue[bytearray] = queue.LifoQueue(maxsize=self.max_buffers)
+        self._lock = threading.Lock()
+        self._last_acquired = time.monotonic()
+        self._drain_timer: threading.Timer | None = None
+
+    def acquire(self) -> bytearray:
+        self._last_acquired = time.monotonic()
+        try:
+            return self._buffers.get_nowait()
+        except queue.Empty:
+            return bytearray(self.buffer_size)
+
+    def release(self, buffer: bytearray) -> None:
+        try:
+            self._buffers.put_nowait(buffer)
+        except queue.Full:
+            return
+        self._schedule_drain()
+
+    @contextmanager
+    def buffer(self):
+        buffer = self.acquire()
+        try:
+            yield memoryview(buffer)
+        finally:
+            self.release(buffer)
+
+    def drain(self) -> int:
+        drained = 0
+        while True:
+            try:
+                self._buffers.get_nowait()
+            except queue.Empty:
+                return drained
+            drained += 1
+
+    def get_stats(self) -> dict:
+        return {
+            "buffer_size": self.buffer_size,
+            "max_buffers": self.max_buffers,
+            "pooled_buffers": self._buffers.qsize(),
+        }
+
+    def _schedule_drain(self) -> None:
+        with self._lock:
+            if self._drain_timer is not None:
+                return
+            timer = threading.Timer(self.idle_seconds, self._drain_if_idle)
+            timer.daemon = True
+            self._drain_timer = timer
+        timer.start()
+
+    def _drain_if_idle(self) -> None:
+        with self._lock:
+            self._drain_timer = None
+        if time.monotonic() - self._last_acquired < self.idle_seconds:
+            self._schedule_drain()
+            return
+        self.drain()
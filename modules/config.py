@@ -28,6 +28,7 @@ class UploadConfig:
     upload_queue_enabled: bool
     max_active_uploads: int
     upload_queue_timeout_seconds: int
+    max_stored_files: int = 100000
 
     @property
     def max_file_size_bytes(self) -> int:
@@ -78,6 +79,8 @@ class ServerConfig:
     access_control_enabled: bool
     allowed_networks: list[str]
     download_config: DownloadConfig = None
+    socketio_history_limit: int = 200
+    message_max_history: int = 10000
 
 
 def _load_yaml(path: Path) -> dict:
@@ -123,6 +126,7 @@ def load_upload_config() -> UploadConfig:
         upload_queue_enabled=False,
         max_active_uploads=3,
         upload_queue_timeout_seconds=300,
+        max_stored_files=100000,
     )
     data = _load_yaml(UPLOAD_CONFIG_PATH)
 
@@ -157,6 +161,7 @@ def load_upload_config() -> UploadConfig:
             1,
             int(upload_throttle.get("queueTimeoutSeconds", defaults.upload_queue_timeout_seconds)),
         ),
+        max_stored_files=max(1, int(limits.get("maxStoredFiles", defaults.max_stored_files))),
     )
 
 
@@ -181,6 +186,8 @@ def load_server_config() -> ServerConfig:
             download_timeout_seconds=300,
             enable_queue=True,
         ),
+        socketio_history_limit=200,
+        message_max_history=10000,
     )
     data = _load_yaml(SERVER_CONFIG_PATH)
 
@@ -196,6 +203,7 @@ def load_server_config() -> ServerConfig:
     autoindex_conf = data.get("autoindex", {}) or {}
     access_control = data.get("access_control", {}) or {}
     download_conf = data.get("download", {}) or {}
+    messages_conf = data.get("messages", {}) or {}
 
     download_config = DownloadConfig(
         max_concurrent_downloads=int(download_conf.get("max_concurrent_downloads", defaults.download_config.max_concurrent_downloads)),
@@ -224,4 +232,12 @@ def load_server_config() -> ServerConfig:
         access_control_enabled=_as_bool(access_control.get("enabled"), defaults.access_control_enabled),
         allowed_networks=list(access_control.get("allowed_networks", defaults.allowed_networks) or []),
         download_config=download_config,
+        socketio_history_limit=max(
+            1,
+            int(socketio_conf.get("history_limit", defaults.socketio_history_limit)),
+        ),
+        message_max_history=max(
+            1,
+            int(messages_conf.get("max_history", defaults.message_max_history)),
+        ),
     )
@@ -6,7 +6,7 @@ from __future__ import annotations
 # - 403xx: access control failures
 # - 404xx: missing resources
 # - 413xx: payload size violations
-# - 500xx: server-side merge/storage failures
+# - 5xxxx: server-side storage/queue failures
 
 # Message route error codes
 MSG_INVALID_PAGINATION = 40001
@@ -22,7 +22,7 @@ UPLOAD_AUTO_CHUNK_DISABLED = 40016
 UPLOAD_EMPTY_FILE = 40017
 UPLOAD_FILE_TOO_LARGE = 41301
 UPLOAD_QUEUE_TIMEOUT = 50301
-UPLOAD_MERGE_VERIFICATION_FAILED = 50001
+UPLOAD_INSUFFICIENT_STORAGE = 50701
 # Core route/media error codes
 ROUTE_ACCESS_FORBIDDEN = 40301
 ROUTE_MEDIA_FILE_NOT_FOUND = 40401
@@ -69,7 +69,7 @@ ERROR_CODE_CATALOG = {
         "name": "UPLOAD_FILE_REQUIRED",
         "http_status": 400,
         "scope": "upload",
-        "description": "The multipart request must include a `file` field.",
+        "description": "A multipart request must include a `file` field (raw octet-stream bodies are the file).",
     },
     UPLOAD_AUTO_CHUNK_DISABLED: {
         "name": "UPLOAD_AUTO_CHUNK_DISABLED",
@@ -89,18 +89,18 @@ ERROR_CODE_CATALOG = {
         "scope": "upload",
         "description": "The uploaded payload exceeded the configured file size limit.",
     },
-    UPLOAD_MERGE_VERIFICATION_FAILED: {
-        "name": "UPLOAD_MERGE_VERIFICATION_FAILED",
-        "http_status": 500,
-        "scope": "upload",
-        "description": "Chunk merge verification failed after writing the upload.",
-    },
     UPLOAD_QUEUE_TIMEOUT: {
         "name": "UPLOAD_QUEUE_TIMEOUT",
         "http_status": 503,
         "scope": "upload",
         "description": "Upload could not start within the configured queue timeout.",
     },
+    UPLOAD_INSUFFICIENT_STORAGE: {
+        "name": "UPLOAD_INSUFFICIENT_STORAGE",
+        "http_status": 507,
+        "scope": "upload",
+        "description": "The server ran out of disk space while storing the upload.",
+    },
     ROUTE_ACCESS_FORBIDDEN: {
         "name": "ROUTE_ACCESS_FORBIDDEN",
         "http_status": 403,
@@ -128,7 +128,7 @@ __all__ = [
     "UPLOAD_EMPTY_FILE",
     "UPLOAD_FILE_TOO_LARGE",
     "UPLOAD_QUEUE_TIMEOUT",
-    "UPLOAD_MERGE_VERIFICATION_FAILED",
+    "UPLOAD_INSUFFICIENT_STORAGE",
     "ROUTE_ACCESS_FORBIDDEN",
     "ROUTE_MEDIA_FILE_NOT_FOUND",
     "ERROR_CODE_CATALOG",
@@ -1,15 +1,60 @@
 from __future__ import annotations
 
+import atexit
 import json
 import logging
-from datetime import datetime
-from logging.handlers import RotatingFileHandler
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 from flask import request
 
+from .response_utils import utc_now_iso_ms
 
-def register_log_routes(app, client_log_config) -> None:
-    client_log_config.path.parent.mkdir(parents=True, exist_ok=True)
+# json.dumps() builds a new JSONEncoder on every call once non-default options are
+# passed; the client log hot path reuses a single preconfigured encoder instead.
+_encode_log_entry = json.JSONEncoder(ensure_ascii=False).encode
+
+# One standalone logger per client log path. The process-wide
+# logging.getLogger("client_log") would collect a handler from every app that
+# registers, so each POST would land in every app's file.
+_client_log_loggers: dict[str, logging.Logger] = {}
+# The listener thread currently writing each path; re-registration swaps it out.
+_client_log_listeners: dict[str, QueueListener] = {}
+_client_log_lock = threading.Lock()
+
+
+def _close_listener(listener: QueueListener) -> None:
+    # stop() writes out everything still queued before the thread exits.
+    listener.stop()
+    for handler in listener.handlers:
+        handler.close()
+
+
+def stop_client_log_listener(path) -> None:
+    """Flush and stop the listener writing ``path``; later entries for it are dropped."""
+    key = os.path.abspath(path)
+    with _client_log_lock:
+        listener = _client_log_listeners.pop(key, None)
+        client_log_logger = _client_log_loggers.get(key)
+        if client_log_logger is not None:
+            for handler in list(client_log_logger.handlers):
+                client_log_logger.removeHandler(handler)
+    if listener is not None:
+        _close_listener(listener)
+
+
+def _stop_client_log_listeners() -> None:
+    for key in list(_client_log_listeners):
+        stop_client_log_listener(key)
+
+
+atexit.register(_stop_client_log_listeners)
+
+
+def _install_client_log(client_log_config) -> tuple[logging.Logger, QueueListener]:
+    key = os.path.abspath(client_log_config.path)
     client_log_handler = RotatingFileHandler(
         client_log_config.path,
         maxBytes=client_log_config.max_bytes,
@@ -18,21 +63,44 @@ def register_log_routes(app, client_log_config) -> None:
     )
     client_log_handler.setLevel(0)
     client_log_handler.setFormatter(None)
-    client_log_logger = logging.getLogger("client_log")
-    client_log_logger.propagate = False
-    client_log_logger.addHandler(client_log_handler)
+    # Request threads only enqueue records; a single listener thread owns the
+    # rotating file handler and does all of the file I/O.
+    client_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = QueueListener(client_log_queue, client_log_handler)
+
+    with _client_log_lock:
+        client_log_logger = _client_log_loggers.get(key)
+        if client_log_logger is None:
+            client_log_logger = _client_log_loggers[key] = logging.Logger("client_log", logging.INFO)
+        # Re-registering the same path replaces the previous handler and
+        # listener instead of stacking another writer for the same file.
+        for previous_handler in list(client_log_logger.handlers):
+            client_log_logger.removeHandler(previous_handler)
+        previous_listener = _client_log_listeners.pop(key, None)
+        if previous_listener is not None:
+            _close_listener(previous_listener)
+        listener.start()
+        _client_log_listeners[key] = listener
+        client_log_logger.addHandler(QueueHandler(client_log_queue))
+    return client_log_logger, listener
+
+
+def register_log_routes(app, client_log_config) -> None:
+    client_log_config.path.parent.mkdir(parents=True, exist_ok=True)
+    client_log_logger, client_log_listener = _install_client_log(client_log_config)
+    app.extensions["client_log_listener"] = client_log_listener
 
     def handle_client_log() -> tuple[str, int]:
         data = request.get_json(silent=True) or {}
         entry = {
-            "server_ts": datetime.utcnow().isoformat(timespec="milliseconds") + "Z",
+            "server_ts": utc_now_iso_ms(),
             "remote_addr": request.headers.get("X-Forwarded-For", request.remote_addr),
             "level": data.get("level", "info"),
             "args": data.get("args", []),
             "page": data.get("page", request.path),
             "ua": request.headers.get("User-Agent", ""),
         }
-        client_log_logger.info(json.dumps(entry, ensure_ascii=False))
+        client_log_logger.info(_encode_log_entry(entry))
         return "", 204
 
     app.add_url_rule("/ui/client-log", endpoint="ui_client_log", view_func=handle_client_log, methods=["POST"])
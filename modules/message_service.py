@@ -1,7 +1,7 @@
 from __future__ import annotations
 
 import time
-from dataclasses import asdict
+from itertools import islice
 from uuid import uuid4
 
 from flask import session
@@ -37,34 +37,65 @@ def append_message(
         client_msg_id=client_msg_id,
         created_at=utc_now_iso(),
     )
+    payload = msg.to_payload()
     with state.messages_lock:
+        if state.messages and len(state.messages) == state.messages.maxlen:
+            state.messages_evicted += 1
+            state.release_message_files(state.messages[0])
+        state.retain_message_files(msg)
         state.messages.append(msg)
+        state.message_payloads.append(payload)
     if broadcast:
-        socketio.emit("message", asdict(msg))
+        socketio.emit("message", payload)
     return msg
 
 
+def history_page(state: AppState, *, limit: int, before: int | None = None) -> dict:
+    """Return up to ``limit`` message payloads ending just before sequence number ``before``.
+
+    ``cursor`` is the sequence number of the oldest returned item, to be passed
+    back as ``before`` for the next older page; it is ``None`` once the oldest
+    retained message is reached.
+    """
+    with state.messages_lock:
+        evicted = state.messages_evicted
+        total = len(state.message_payloads)
+        end = total if before is None else min(max(before - evicted, 0), total)
+        start = max(end - max(limit, 0), 0)
+        items = list(islice(state.message_payloads, start, end))
+    return {"items": items, "cursor": evicted + start if start > 0 else None}
+
+
 def default_username(state: AppState) -> str:
     terminal_session_id = session.get("terminal_session_id")
-    with state.clients_lock:
-        if terminal_session_id and terminal_session_id in state.terminal_sessions:
-            return state.terminal_sessions[terminal_session_id].get("username", "Anonymous")
+    if not terminal_session_id:
+        return "Anonymous"
+    with state.client_lock(terminal_session_id):
+        terminal_record = state.terminal_sessions.get(terminal_session_id)
+        if terminal_record:
+            return terminal_record.get("username", "Anonymous")
     return "Anonymous"
 
 
 def list_messages(state: AppState, *, limit: int, cursor: int, since_raw: str = "") -> tuple[dict | None, str | None]:
     with state.messages_lock:
-        filtered = list(state.messages)
+        first_seq = state.messages_evicted
+        snapshot = list(state.messages)
+    # Cursors are absolute sequence numbers (see AppState.messages_evicted), so
+    # a page boundary does not shift when old messages fall out of the ring.
+    filtered = list(enumerate(snapshot, start=first_seq))
     if since_raw:
         since_dt = parse_utc(since_raw)
         if since_dt is None:
             return None, "invalid since timestamp"
-        filtered = [m for m in filtered if parse_utc(m.created_at or "") and parse_utc(m.created_at) >= since_dt]
+        filtered = [
+            (seq, m) for seq, m in filtered if parse_utc(m.created_at or "") and parse_utc(m.created_at) >= since_dt
+        ]
 
     total = len(filtered)
-    end = min(cursor + limit, total)
-    page = filtered[cursor:end]
-    next_cursor = str(end) if end < total else None
+    remaining = [(seq, m) for seq, m in filtered if seq >= cursor]
+    page = [m for _seq, m in remaining[:limit]]
+    next_cursor = str(remaining[limit][0]) if len(remaining) > limit else None
 
     return {
         "items": page,
@@ -95,8 +126,8 @@ def determine_message_kind(text: str, attachments: list[dict]) -> str:
 
 
 def client_names(state: AppState) -> list[str]:
-    with state.clients_lock:
-        return list(state.clients.values())
+    # dict.copy() is a single atomic snapshot, so no shard lock is needed here.
+    return list(state.clients.copy().values())
 
 
 def emit_clients(state: AppState, socketio) -> None:
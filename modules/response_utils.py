@@ -1,6 +1,8 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+import time
+from datetime import datetime
+from functools import lru_cache
 
 from flask import jsonify
 
@@ -19,8 +21,19 @@ JsonData = dict | list | None
 # in this JSON envelope.
 
 
+@lru_cache(maxsize=1)
+def _iso_seconds(epoch_seconds: int) -> str:
+    # Calls within the same second share one strftime result.
+    return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(epoch_seconds))
+
+
 def utc_now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
+    return _iso_seconds(time.time_ns() // 1_000_000_000)
+
+
+def utc_now_iso_ms() -> str:
+    now_ns = time.time_ns()
+    return f"{_iso_seconds(now_ns // 1_000_000_000)[:-1]}.{now_ns // 1_000_000 % 1000:03d}Z"
 
 
 def json_response(*, code: int, message: str, data: JsonData, status: int):
@@ -85,22 +85,14 @@ def _resolve_media_entry_by_ref(state, file_ref: str) -> dict | None:
         if not file_ref.isdigit():
             return None
 
-        alias_index = int(file_ref)
-        if alias_index <= 0:
-            return None
-
-        # Alias order follows files_index order to keep /files and /media/N consistent.
-        items = list(state.uploaded_files.values())
-
-    items.sort(key=lambda x: (x.get("uploaded_at", ""), x.get("file_id", "")))
-    if alias_index > len(items):
-        return None
-    return items[alias_index - 1]
+        # Aliases are numbered once when a file is stored, so /media/N keeps
+        # pointing at the same file after other uploads are evicted.
+        return state.uploaded_files.resolve_alias(int(file_ref))
 
 
-def _build_files_index_html(entries: list[dict]) -> str:
+def _build_files_index_html(entries: list[tuple[int, dict]]) -> str:
     rows = []
-    for index, entry in enumerate(entries, start=1):
+    for index, entry in entries:
         file_id = entry.get("file_id", "")
         original_name = entry.get("original_name", "")
         size = entry.get("size", 0)
@@ -198,8 +190,9 @@ def _register_page_routes(app, upload_config, server_config, state) -> None:
             return "Not Found", 404
 
         with state.uploads_lock:
-            items = list(state.uploaded_files.values())
-        items.sort(key=lambda x: (x.get("uploaded_at", ""), x.get("file_id", "")))
+            uploaded_files = state.uploaded_files
+            items = [(uploaded_files.alias_of(file_id), entry) for file_id, entry in uploaded_files.items()]
+        items.sort(key=lambda item: item[0])
 
         return _build_files_index_html(items)
     
@@ -1,15 +1,14 @@
 from __future__ import annotations
 
-from dataclasses import asdict
 from uuid import uuid4
 
 from flask import request, session
 from flask_socketio import emit
 
-from .message_service import append_message, emit_clients
+from .message_service import append_message, emit_clients, history_page
 
 
-def register_socket_handlers(socketio, state) -> None:
+def register_socket_handlers(socketio, state, *, history_limit: int = 200) -> None:
     @socketio.on("register")
     def handle_register(data: dict) -> dict:
         username = ((data or {}).get("username") or "").strip()
@@ -24,7 +23,7 @@ def register_socket_handlers(socketio, state) -> None:
             terminal_session_id = str(uuid4())
             session["terminal_session_id"] = terminal_session_id
 
-        with state.clients_lock:
+        with state.client_lock(terminal_session_id):
             terminal_record = state.terminal_sessions.setdefault(
                 terminal_session_id,
                 {"username": username, "sids": set()},
@@ -35,35 +34,43 @@ def register_socket_handlers(socketio, state) -> None:
             state.sid_to_terminal_session[request.sid] = terminal_session_id
             state.clients[request.sid] = username
 
-        with state.messages_lock:
-            history = [asdict(m) for m in state.messages]
-        emit("history", history)
+        # Only the newest page goes out on register; older pages are fetched via "history_page".
+        page = history_page(state, limit=history_limit)
+        emit("history", page["items"])
         emit_clients(state, socketio)
-        return {"ok": True}
+        return {"ok": True, "history_cursor": page["cursor"]}
+
+    @socketio.on("history_page")
+    def handle_history_page(data: dict) -> dict:
+        data = data or {}
+        try:
+            before = int(data["before"])
+            limit = int(data.get("limit", history_limit))
+        except (KeyError, TypeError, ValueError):
+            return {"ok": False, "error": "before must be an integer cursor"}
+        page = history_page(state, limit=min(max(limit, 1), history_limit), before=before)
+        return {"ok": True, "items": page["items"], "cursor": page["cursor"]}
 
     @socketio.on("message")
     def handle_message(data: dict) -> None:
         text = (data or {}).get("text", "").strip()
         if not text:
             return
-        with state.clients_lock:
-            username = state.clients.get(request.sid, "Anonymous")
+        username = state.clients.get(request.sid, "Anonymous")
         append_message(state, socketio, user=username, text=text, kind="text", broadcast=True)
 
     @socketio.on("disconnect")
     def handle_disconnect() -> None:
-        removed = False
-        with state.clients_lock:
-            if request.sid in state.clients:
-                state.clients.pop(request.sid, None)
-                removed = True
+        terminal_session_id = state.sid_to_terminal_session.pop(request.sid, None)
+        if terminal_session_id:
+            with state.client_lock(terminal_session_id):
+                terminal_record = state.terminal_sessions.get(terminal_session_id)
+                if terminal_record is not None:
+                    terminal_record["sids"].discard(request.sid)
+                    if not terminal_record["sids"]:
+                        state.terminal_sessions.pop(terminal_session_id, None)
 
-            terminal_session_id = state.sid_to_terminal_session.pop(request.sid, None)
-            if terminal_session_id and terminal_session_id in state.terminal_sessions:
-                terminal_record = state.terminal_sessions[terminal_session_id]
-                terminal_record["sids"].discard(request.sid)
-                if not terminal_record["sids"]:
-                    state.terminal_sessions.pop(terminal_session_id, None)
+        removed = state.clients.pop(request.sid, None) is not None
 
         if removed:
             emit_clients(state, socketio)
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
 from threading import Lock, RLock
-from typing import Dict, List, Optional
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+CLIENT_LOCK_SHARDS = 16
 
 
 @dataclass
@@ -17,16 +20,128 @@ class Message:
     client_msg_id: str | None = None
     created_at: str = ""
 
+    def file_ids(self) -> list[str]:
+        source = self.attachments or ([] if self.file is None else [self.file])
+        return [entry["file_id"] for entry in source if entry.get("file_id")]
+
+    def to_payload(self) -> dict:
+        # Shallow replacement for dataclasses.asdict(): the nested file and
+        # attachment entries are shared instead of recursively deep-copied.
+        return {
+            "msg_id": self.msg_id,
+            "user": self.user,
+            "text": self.text,
+            "ts": self.ts,
+            "kind": self.kind,
+            "file": self.file,
+            "attachments": self.attachments,
+            "client_msg_id": self.client_msg_id,
+            "created_at": self.created_at,
+        }
+
+
+class UploadedFileIndex(OrderedDict):
+    """file_id -> entry map that evicts the least recently used entry past `capacity`.
+
+    Reads through [] / get() count as use. Entries for which `is_pinned(file_id)`
+    is true (still linked from retained messages) are skipped, so the map may
+    exceed `capacity` while history holds more files than that. `on_evict`
+    receives each evicted entry so the caller can release whatever backs it
+    (the stored file).
+
+    Every file_id gets a fixed `/media/N` alias number when it is first stored.
+    Numbers are never reused, so evicting an entry cannot shift a shared alias
+    onto a different file.
+    """
+
+    def __init__(
+        self,
+        *args,
+        capacity: Optional[int] = None,
+        on_evict: Callable[[dict], None] | None = None,
+        is_pinned: Callable[[str], bool] | None = None,
+        **kwargs,
+    ) -> None:
+        self.capacity = capacity
+        self.on_evict = on_evict
+        self.is_pinned = is_pinned
+        self._next_alias = 1
+        self._alias_by_id: Dict[str, int] = {}
+        self._id_by_alias: Dict[int, str] = {}
+        super().__init__(*args, **kwargs)
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        return self[key]
+
+    def alias_of(self, file_id: str) -> Optional[int]:
+        return self._alias_by_id.get(file_id)
+
+    def resolve_alias(self, alias: int) -> Optional[dict]:
+        file_id = self._id_by_alias.get(alias)
+        return None if file_id is None else self.get(file_id)
+
+    def __setitem__(self, key, value) -> None:
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if key not in self._alias_by_id:
+            self._alias_by_id[key] = self._next_alias
+            self._id_by_alias[self._next_alias] = key
+            self._next_alias += 1
+        if self.capacity is None or len(self) <= self.capacity:
+            return
+        excess = len(self) - self.capacity
+        victims = []
+        # Oldest first; pinned entries are passed over in place so they keep their LRU position.
+        for file_id in self:
+            if file_id == key or (self.is_pinned is not None and self.is_pinned(file_id)):
+                continue
+            victims.append(file_id)
+            if len(victims) == excess:
+                break
+        for file_id in victims:
+            evicted = self.pop(file_id)
+            self._id_by_alias.pop(self._alias_by_id.pop(file_id, None), None)
+            if self.on_evict is not None:
+                self.on_evict(evicted)
+
 
 @dataclass
 class AppState:
-    messages: List[Message] = field(default_factory=list)
+    # Bounded ring of the most recent messages; the oldest entry is dropped once
+    # `max_messages` is reached. None keeps the history unbounded.
+    messages: Deque[Message] = field(default_factory=deque)
+    # Column of emit-ready dicts kept index-aligned with `messages`, so history
+    # snapshots are a list copy instead of one payload build per stored message.
+    message_payloads: Deque[dict] = field(default_factory=deque)
+    max_messages: Optional[int] = None
+    # Messages dropped off the front of the ring so far. messages[i] has the
+    # absolute sequence number messages_evicted + i, which is what paging
+    # cursors carry so they stay valid while the ring rotates.
+    messages_evicted: int = 0
+    # file_id -> number of retained messages linking it. Uploads still linked
+    # from history are never evicted from `uploaded_files`.
+    message_file_refs: Dict[str, int] = field(default_factory=dict)
     clients: Dict[str, str] = field(default_factory=dict)
     terminal_sessions: Dict[str, dict] = field(default_factory=dict)
     sid_to_terminal_session: Dict[str, str] = field(default_factory=dict)
     upload_sessions: Dict[str, dict] = field(default_factory=dict)
+    # LRU-bounded by `max_uploaded_files` (None keeps it unbounded).
     uploaded_files: Dict[str, dict] = field(default_factory=dict)
-    clients_lock: Lock = field(default_factory=Lock)
+    max_uploaded_files: Optional[int] = None
+    # Terminal bookkeeping is guarded per shard of terminal_session_id, so
+    # register/disconnect storms for different terminals do not queue on one
+    # mutex. Single dict operations on `clients` / `sid_to_terminal_session`
+    # are atomic and need no lock of their own.
+    client_locks: Tuple[Lock, ...] = field(
+        default_factory=lambda: tuple(Lock() for _ in range(CLIENT_LOCK_SHARDS))
+    )
     messages_lock: RLock = field(default_factory=RLock)
     uploads_lock: RLock = field(default_factory=RLock)
     
@@ -34,6 +149,36 @@ class AppState:
     download_manager: Optional[object] = field(default=None, init=False)
     upload_manager: Optional[object] = field(default=None, init=False)
 
+    def __post_init__(self) -> None:
+        self.messages = deque(self.messages, maxlen=self.max_messages)
+        payloads = self.message_payloads
+        if len(payloads) != len(self.messages):
+            payloads = [m.to_payload() for m in self.messages]
+        # Same maxlen on both, so paired appends evict in lockstep.
+        self.message_payloads = deque(payloads, maxlen=self.max_messages)
+        for message in self.messages:
+            self.retain_message_files(message)
+        self.uploaded_files = UploadedFileIndex(
+            self.uploaded_files,
+            capacity=self.max_uploaded_files,
+            is_pinned=lambda file_id: self.message_file_refs.get(file_id, 0) > 0,
+        )
+
+    def retain_message_files(self, message: Message) -> None:
+        for file_id in message.file_ids():
+            self.message_file_refs[file_id] = self.message_file_refs.get(file_id, 0) + 1
+
+    def release_message_files(self, message: Message) -> None:
+        for file_id in message.file_ids():
+            remaining = self.message_file_refs.get(file_id, 0) - 1
+            if remaining > 0:
+                self.message_file_refs[file_id] = remaining
+            else:
+                self.message_file_refs.pop(file_id, None)
+
+    def client_lock(self, terminal_session_id: str) -> Lock:
+        return self.client_locks[hash(terminal_session_id) % len(self.client_locks)]
+
     def get_download_manager(self):
         """获取下载管理器（延迟初始化）"""
         if self.download_manager is None:
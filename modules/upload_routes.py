@@ -11,6 +11,14 @@ from .message_service import default_username
 from .response_utils import error_response, normalize_bool, ok_response
 from .upload_service import orchestrate_auto_upload
 
+RAW_UPLOAD_MIMETYPE = "application/octet-stream"
+
+
+def _is_raw_upload() -> bool:
+    # Raw bodies bypass the multipart parser, which would first spool the whole
+    # file to a temporary file before the handler could read it.
+    return request.mimetype == RAW_UPLOAD_MIMETYPE
+
 
 def _parse_upload_file():
     upload_file = request.files.get("file")
@@ -19,11 +27,11 @@ def _parse_upload_file():
     return upload_file, None
 
 
-def _parse_upload_flags(upload_config):
-    chunked = normalize_bool(request.form.get("chunked"), upload_config.auto_chunk_default_enabled)
+def _parse_upload_flags(upload_config, fields):
+    chunked = normalize_bool(fields.get("chunked"), upload_config.auto_chunk_default_enabled)
     if chunked and not upload_config.auto_chunk_enabled:
         return None, error_response("auto chunk upload is disabled", 400, UPLOAD_AUTO_CHUNK_DISABLED)
-    create_message = normalize_bool(request.form.get("create_message"), False)
+    create_message = normalize_bool(fields.get("create_message"), False)
     return {
         "chunked": chunked,
         "create_message": create_message,
@@ -45,19 +53,49 @@ def _parse_upload_payload(upload_file):
     }, None
 
 
+def _parse_raw_upload_payload() -> dict:
+    content_length = request.content_length
+    return {
+        "client_msg_id": (request.args.get("client_msg_id") or "").strip(),
+        "mime": (request.args.get("mime_type") or "").strip(),
+        "expected_size": content_length if content_length and content_length > 0 else None,
+    }
+
+
+def _parse_upload_source():
+    if _is_raw_upload():
+        return {
+            "stream": request.stream,
+            "filename": request.args.get("filename") or "",
+            "fields": request.args,
+            "payload": _parse_raw_upload_payload(),
+        }, None
+
+    upload_file, error = _parse_upload_file()
+    if error:
+        return None, error
+    payload, error = _parse_upload_payload(upload_file)
+    if error:
+        return None, error
+    return {
+        "stream": upload_file.stream,
+        "filename": upload_file.filename or "",
+        "fields": request.form,
+        "payload": payload,
+    }, None
+
+
 def register_upload_routes(app, socketio, upload_config, state) -> None:
     def handle_upload_auto():
-        upload_file, error = _parse_upload_file()
+        source, error = _parse_upload_source()
         if error:
             return error
 
-        flags, error = _parse_upload_flags(upload_config)
+        flags, error = _parse_upload_flags(upload_config, source["fields"])
         if error:
             return error
 
-        payload, error = _parse_upload_payload(upload_file)
-        if error:
-            return error
+        payload = source["payload"]
 
         slot = None
         queue_enabled = getattr(upload_config, "upload_queue_enabled", False)
@@ -75,8 +113,8 @@ def register_upload_routes(app, socketio, upload_config, state) -> None:
                 upload_config,
                 state,
                 socketio,
-                upload_stream=upload_file.stream,
-                filename=upload_file.filename or "",
+                upload_stream=source["stream"],
+                filename=source["filename"],
                 mime=payload["mime"],
                 client_msg_id=payload["client_msg_id"],
                 chunked=chunked,
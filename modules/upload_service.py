@@ -1,15 +1,21 @@
 from __future__ import annotations
 
+import errno
+import mimetypes
+import os
+import unicodedata
+from urllib.parse import quote
 from uuid import uuid4
 
-from flask import send_file
+from flask import current_app, request
 from werkzeug.utils import secure_filename
+from werkzeug.wsgi import wrap_file
 
 from .error_codes import (
     ROUTE_MEDIA_FILE_NOT_FOUND,
     UPLOAD_EMPTY_FILE,
     UPLOAD_FILE_TOO_LARGE,
-    UPLOAD_MERGE_VERIFICATION_FAILED,
+    UPLOAD_INSUFFICIENT_STORAGE,
 )
 from .message_service import append_message
 from .response_utils import utc_now_iso
@@ -18,7 +24,7 @@ from .upload_storage import (
     choose_chunk_size,
     create_upload_session,
     merge_chunks,
-    save_stream_as_chunks,
+    save_stream_preallocated,
     save_stream_to_file,
     save_upload_chunk,
 )
@@ -28,11 +34,12 @@ __all__ = [
     "create_upload_session",
     "save_upload_chunk",
     "save_stream_to_file",
-    "save_stream_as_chunks",
+    "save_stream_preallocated",
     "merge_chunks",
     "finalize_upload_session",
     "store_auto_uploaded_file",
     "store_uploaded_file",
+    "remove_stored_file",
     "serialize_attachment",
     "serialize_message",
     "map_auto_upload_error",
@@ -45,12 +52,11 @@ def finalize_upload_session(
     upload_config, upload_sessions: dict, uploaded_files: dict, *, upload_id: str, total_chunks: int
 ) -> dict:
     session_info = upload_sessions.pop(upload_id)
-    safe_name = secure_filename(session_info["filename"]) or f"{upload_id}.bin"
-    stored_name = f"{upload_id}_{safe_name}"
+    stored_name = session_info["stored_name"]
     final_path = upload_config.upload_dir / stored_name
 
-    merged_bytes = merge_chunks(upload_id, total_chunks, final_path, upload_config)
     declared_size = int(session_info.get("size") or 0)
+    merged_bytes = merge_chunks(upload_id, total_chunks, final_path, upload_config, expected_size=declared_size)
     if declared_size > 0 and merged_bytes != declared_size:
         final_path.unlink(missing_ok=True)
         raise RuntimeError("merged size does not match declared size")
@@ -68,7 +74,6 @@ def finalize_upload_session(
 
 def store_auto_uploaded_file(
     upload_config,
-    upload_sessions: dict,
     uploaded_files: dict,
     *,
     upload_stream,
@@ -77,7 +82,7 @@ def store_auto_uploaded_file(
     client_msg_id: str,
     chunked: bool,
     expected_size: int | None = None,
-) -> tuple[dict, int]:
+) -> dict:
     file_id = str(uuid4())
     safe_name = secure_filename(filename or "") or f"{file_id}.bin"
     stored_name = f"{file_id}_{safe_name}"
@@ -85,20 +90,10 @@ def store_auto_uploaded_file(
 
     try:
         if chunked:
-            total_chunks, bytes_written = save_stream_as_chunks(
-                upload_stream,
-                file_id,
-                upload_config,
-                upload_sessions,
-                expected_size,
-            )
-            if total_chunks == 0:
-                raise EOFError("empty file")
-            merged_bytes = merge_chunks(file_id, total_chunks, final_path, upload_config)
-            if merged_bytes != bytes_written:
+            actual_size = save_stream_preallocated(upload_stream, final_path, upload_config, expected_size)
+            if actual_size <= 0:
                 final_path.unlink(missing_ok=True)
-                raise RuntimeError("merge verification failed")
-            actual_size = merged_bytes
+                raise EOFError("empty file")
         else:
             actual_size = save_stream_to_file(upload_stream, final_path, upload_config)
             if actual_size <= 0:
@@ -118,7 +113,7 @@ def store_auto_uploaded_file(
         client_msg_id=client_msg_id,
         uploaded_files=uploaded_files,
     )
-    return entry, choose_chunk_size(upload_config, upload_sessions, expected_size)
+    return entry
 
 
 def store_uploaded_file(
@@ -150,16 +145,31 @@ def store_uploaded_file(
     return entry
 
 
+def remove_stored_file(upload_config, entry: dict) -> None:
+    # Eviction hook for state.uploaded_files: once an entry is dropped its media
+    # URL is gone, so the stored file would only leak disk space.
+    stored_name = entry.get("stored_name")
+    if not stored_name:
+        return
+    try:
+        os.remove(os.path.join(upload_config.upload_dir, stored_name))
+    except OSError:
+        pass
+
+
 def serialize_attachment(entry: dict) -> dict:
+    file_id = entry.get("file_id", "")
+    fallback_download_url = f"/media/{file_id}?download=1"
+    download_url = entry.get("download_url") or fallback_download_url
     return {
         "file_id": entry.get("file_id"),
         "filename": entry.get("original_name"),
         "size": entry.get("size"),
         "mime_type": entry.get("mime"),
-        "url": entry.get("download_url") or f"/media/{entry.get('file_id', '')}?download=1",
-        "download_url": entry.get("download_url") or f"/media/{entry.get('file_id', '')}?download=1",
-        "alias_url": entry.get("alias_url") or f"/media/{entry.get('file_id', '')}?download=1",
-        "inline_url": entry.get("url") or f"/media/{entry.get('file_id', '')}",
+        "url": download_url,
+        "download_url": download_url,
+        "alias_url": entry.get("alias_url") or fallback_download_url,
+        "inline_url": entry.get("url") or f"/media/{file_id}",
     }
 
 
@@ -183,10 +193,10 @@ def serialize_message(message: Message) -> dict:
 def map_auto_upload_error(exc: Exception) -> tuple[str, int, int]:
     if isinstance(exc, EOFError):
         return "empty file", 400, UPLOAD_EMPTY_FILE
-    if isinstance(exc, RuntimeError):
-        return "merge verification failed", 500, UPLOAD_MERGE_VERIFICATION_FAILED
     if isinstance(exc, ValueError):
         return "file too large", 413, UPLOAD_FILE_TOO_LARGE
+    if isinstance(exc, OSError) and exc.errno == errno.ENOSPC:
+        return "insufficient storage", 507, UPLOAD_INSUFFICIENT_STORAGE
     raise exc
 
 
@@ -206,9 +216,8 @@ def orchestrate_auto_upload(
 ) -> tuple[dict | None, tuple[str, int, int] | None]:
     try:
         with state.uploads_lock:
-            entry, chunk_size = store_auto_uploaded_file(
+            entry = store_auto_uploaded_file(
                 upload_config,
-                state.upload_sessions,
                 state.uploaded_files,
                 upload_stream=upload_stream,
                 filename=filename,
@@ -217,7 +226,7 @@ def orchestrate_auto_upload(
                 chunked=chunked,
                 expected_size=expected_size,
             )
-    except (EOFError, RuntimeError, ValueError) as exc:
+    except (EOFError, ValueError, OSError) as exc:
         return None, map_auto_upload_error(exc)
 
     if create_message:
@@ -236,20 +245,61 @@ def orchestrate_auto_upload(
         "file": serialize_attachment(entry),
         "upload": {
             "chunked": chunked,
-            "chunk_size": chunk_size,
         },
     }, None
 
 
+_MEDIA_BUFFER_SIZE = 1024 * 1024
+
+
+def _content_disposition_options(download_name: str) -> dict:
+    try:
+        download_name.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", download_name).encode("ascii", "ignore").decode("ascii")
+        quoted = quote(download_name, safe="!#$&+-.^_`|~")
+        return {"filename": simple, "filename*": f"UTF-8''{quoted}"}
+    return {"filename": download_name}
+
+
+def _media_etag(file_id: str, stat_result: os.stat_result) -> str:
+    return f"{file_id}-{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"
+
+
 def send_entry(entry: dict, upload_config, error_response, *, as_attachment: bool):
-    file_path = upload_config.upload_dir / entry["stored_name"]
-    if not file_path.exists():
+    file_path = os.path.join(upload_config.upload_dir, entry["stored_name"])
+    try:
+        media_file = open(file_path, "rb", buffering=0)
+    except FileNotFoundError:
         return error_response("file not found", 404, ROUTE_MEDIA_FILE_NOT_FOUND)
 
-    return send_file(
-        file_path,
-        mimetype=entry.get("mime") or None,
-        as_attachment=as_attachment,
-        download_name=entry.get("original_name"),
-        conditional=True,
-    )
+    try:
+        # One fstat on the open fd replaces the exists() + stat() + reopen done by send_file.
+        stat_result = os.fstat(media_file.fileno())
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(media_file.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+
+        download_name = entry.get("original_name") or entry["stored_name"]
+        mimetype = entry.get("mime") or mimetypes.guess_type(download_name)[0] or "application/octet-stream"
+
+        # wrap_file hands the raw file to the server's wsgi.file_wrapper when present,
+        # so gunicorn/uWSGI can serve the body with sendfile(2).
+        response = current_app.response_class(
+            wrap_file(request.environ, media_file, buffer_size=_MEDIA_BUFFER_SIZE),
+            mimetype=mimetype,
+            direct_passthrough=True,
+        )
+        response.headers.set(
+            "Content-Disposition",
+            "attachment" if as_attachment else "inline",
+            **_content_disposition_options(download_name),
+        )
+        response.content_length = stat_result.st_size
+        response.last_modified = stat_result.st_mtime
+        response.cache_control.no_cache = True
+        response.set_etag(_media_etag(entry.get("file_id") or entry["stored_name"], stat_result))
+        response.make_conditional(request.environ, accept_ranges=True, complete_length=stat_result.st_size)
+    except BaseException:
+        media_file.close()
+        raise
+    return response
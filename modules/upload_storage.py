@@ -1,42 +1,137 @@
 from __future__ import annotations
 
-from datetime import datetime, timezone
+import errno
+import os
+import shutil
+import sys
 from pathlib import Path
 from uuid import uuid4
 
-
-def _iter_stream_chunks(stream, read_size: int):
-    while True:
-        data = stream.read(read_size)
+from werkzeug.utils import secure_filename
+
+from .buffer_pool import BufferPool
+from .response_utils import utc_now_iso
+
+_O_BINARY = getattr(os, "O_BINARY", 0)
+# Errors meaning "this copy primitive does not work for these fds", as opposed to real I/O failures.
+_UNSUPPORTED_COPY_ERRNOS = {
+    errno.EXDEV,
+    errno.ENOSYS,
+    errno.EINVAL,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.ENOTSOCK,
+}
+
+
+def _kernel_copy_functions() -> list:
+    functions = []
+    if hasattr(os, "copy_file_range"):
+        functions.append(lambda in_fd, out_fd, count: os.copy_file_range(in_fd, out_fd, count))
+    # Only Linux sendfile(2) accepts a regular file as the output and offset=None;
+    # macOS/BSD require a socket there.
+    if hasattr(os, "sendfile") and sys.platform.startswith("linux"):
+        functions.append(lambda in_fd, out_fd, count: os.sendfile(out_fd, in_fd, None, count))
+    return functions
+
+
+def _copy_fd(in_fd: int, out_fd: int, count: int) -> int:
+    """Copy up to ``count`` bytes from the current offset of ``in_fd`` to ``out_fd``.
+
+    Prefers copy_file_range/sendfile so the data never leaves the kernel, and
+    falls back to a plain read/write loop where neither is usable or one stops
+    early. The result is short of ``count`` only when ``in_fd`` hits EOF.
+    """
+    copied = 0
+    for copy_function in _kernel_copy_functions():
+        try:
+            while copied < count:
+                sent = copy_function(in_fd, out_fd, count - copied)
+                if not sent:
+                    # Some filesystems report 0 before EOF; resume with the next primitive.
+                    break
+                copied += sent
+        except OSError as exc:
+            if exc.errno not in _UNSUPPORTED_COPY_ERRNOS:
+                raise
+        if copied == count:
+            return copied
+
+    while copied < count:
+        data = os.read(in_fd, min(1024 * 1024, count - copied))
         if not data:
             break
-        yield data
+        view = memoryview(data)
+        while view:
+            view = view[os.write(out_fd, view):]
+        copied += len(data)
+    return copied
 
 
-def _write_chunk(output, data: bytes, *, bytes_written: int, max_bytes: int | None) -> int:
-    bytes_written += len(data)
-    if max_bytes is not None and bytes_written > max_bytes:
-        raise ValueError("file too large")
-    output.write(data)
-    return bytes_written
+def _preallocate(fd: int, size: int) -> None:
+    if size <= 0 or not hasattr(os, "posix_fallocate"):
+        return
+    try:
+        os.posix_fallocate(fd, 0, size)
+    except OSError as exc:
+        if exc.errno not in _UNSUPPORTED_COPY_ERRNOS:
+            raise
+
+
+_IO_BUFFER_SIZE = 1024 * 1024
+_buffer_pool = BufferPool(buffer_size=_IO_BUFFER_SIZE, max_buffers=6)
+
+
+def configure_buffer_pool(max_buffers: int) -> None:
+    """Resize the shared upload buffer pool, typically to twice the chunk concurrency."""
+    global _buffer_pool
+    previous = _buffer_pool
+    _buffer_pool = BufferPool(buffer_size=_IO_BUFFER_SIZE, max_buffers=max_buffers)
+    previous.drain()
+
+
+def _readinto(stream, view: memoryview) -> int:
+    readinto = getattr(stream, "readinto", None)
+    if readinto is not None:
+        return readinto(view) or 0
+    data = stream.read(len(view))
+    view[: len(data)] = data
+    return len(data)
+
+
+def _write_all(output, view: memoryview) -> None:
+    while view:
+        view = view[output.write(view):]
 
 
 def _copy_stream_to_output(
-    stream, output, *, read_size: int, max_bytes: int | None, bytes_written: int = 0
+    stream, output, view: memoryview, *, max_bytes: int | None, bytes_written: int = 0
 ) -> int:
-    for data in _iter_stream_chunks(stream, read_size):
-        bytes_written = _write_chunk(output, data, bytes_written=bytes_written, max_bytes=max_bytes)
+    while True:
+        size = _readinto(stream, view)
+        if not size:
+            break
+        bytes_written += size
+        if max_bytes is not None and bytes_written > max_bytes:
+            raise ValueError("file too large")
+        _write_all(output, view[:size])
     return bytes_written
 
 
-def _chunk_path(chunk_dir: Path, index: int) -> Path:
-    return chunk_dir / f"chunk_{index:06d}.part"
+def _chunk_path(chunk_dir: str, index: int) -> str:
+    # Plain string joins: these run once per chunk, where PurePath construction shows up.
+    return os.path.join(chunk_dir, f"chunk_{index:06d}.part")
 
 
-def _cleanup_chunk_dir(chunk_dir: Path) -> None:
-    for chunk_path in chunk_dir.glob("chunk_*.part"):
-        chunk_path.unlink(missing_ok=True)
-    chunk_dir.rmdir()
+def _present_chunk_indexes(chunk_dir: str) -> set[int]:
+    # One directory read instead of a stat per expected chunk.
+    indexes = set()
+    with os.scandir(chunk_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith("chunk_") and name.endswith(".part") and name[6:-5].isdigit():
+                indexes.add(int(name[6:-5]))
+    return indexes
 
 
 def choose_chunk_size(upload_config, upload_sessions: dict, expected_size: int | None = None) -> int:
@@ -68,14 +163,20 @@ def create_upload_session(
     client_msg_id: str,
 ) -> dict:
     upload_id = str(uuid4())
+    # Sanitized once here so completing the upload is only a lookup.
+    safe_name = secure_filename(filename or "") or f"{upload_id}.bin"
+    # Created once per session; every chunk write reuses this string.
+    chunk_dir = os.path.join(upload_config.chunk_dir, upload_id)
     upload_sessions[upload_id] = {
         "filename": filename,
+        "stored_name": f"{upload_id}_{safe_name}",
+        "chunk_dir": chunk_dir,
         "size": size,
         "mime": mime,
         "client_msg_id": client_msg_id,
-        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z"),
+        "created_at": utc_now_iso(),
     }
-    (upload_config.chunk_dir / upload_id).mkdir(parents=True, exist_ok=True)
+    os.makedirs(chunk_dir, exist_ok=True)
     return {
         "upload_id": upload_id,
         "chunk_size": choose_chunk_size(upload_config, upload_sessions, size),
@@ -98,75 +199,121 @@ def save_upload_chunk(
     if index < 0 or total_chunks <= 0 or index >= total_chunks:
         raise IndexError("chunk index out of range")
 
-    chunk_dir = upload_config.chunk_dir / upload_id
-    chunk_dir.mkdir(parents=True, exist_ok=True)
-    chunk_path = _chunk_path(chunk_dir, index)
+    chunk_path = _chunk_path(upload_sessions[upload_id]["chunk_dir"], index)
 
-    with chunk_path.open("wb") as output:
+    with open(chunk_path, "wb", buffering=0) as output, _buffer_pool.buffer() as view:
         chunk_stream.seek(0)
-        _copy_stream_to_output(
-            chunk_stream,
-            output,
-            read_size=1024 * 1024,
-            max_bytes=None,
-        )
+        _copy_stream_to_output(chunk_stream, output, view, max_bytes=None)
 
     return {"upload_id": upload_id, "index": index}
 
 
 def save_stream_to_file(stream, destination: Path, upload_config) -> int:
-    with destination.open("wb") as output:
+    # Unbuffered FileIO: the reused buffer goes straight to write(2) without a BufferedWriter copy.
+    with destination.open("wb", buffering=0) as output, _buffer_pool.buffer() as view:
         return _copy_stream_to_output(
             stream,
             output,
-            read_size=1024 * 1024,
+            view,
             max_bytes=upload_config.max_file_size_bytes,
         )
 
 
-def save_stream_as_chunks(
-    stream, upload_id: str, upload_config, upload_sessions: dict, expected_size: int | None = None
-) -> tuple[int, int]:
-    chunk_size = choose_chunk_size(upload_config, upload_sessions, expected_size)
-    chunk_dir = upload_config.chunk_dir / upload_id
-    chunk_dir.mkdir(parents=True, exist_ok=True)
+def save_stream_preallocated(
+    stream, destination: Path, upload_config, expected_size: int | None = None
+) -> int:
+    """Write ``stream`` into a preallocated temp file and rename it over ``destination``.
 
-    total_bytes = 0
-    total_chunks = 0
-    for data in _iter_stream_chunks(stream, chunk_size):
-        total_bytes += len(data)
-        if total_bytes > upload_config.max_file_size_bytes:
-            raise ValueError("file too large")
-        chunk_path = _chunk_path(chunk_dir, total_chunks)
-        with chunk_path.open("wb") as output:
-            output.write(data)
-        total_chunks += 1
+    The body is already one ordered stream, so its bytes land in their final
+    file in a single pass; there are no part files to merge afterwards.
+    """
+    if expected_size and expected_size > upload_config.max_file_size_bytes:
+        # Refuse before reserving anything for a body that declares more than the limit.
+        raise ValueError("file too large")
+
+    tmp_destination = destination.with_suffix(destination.suffix + ".tmp")
+    try:
+        with tmp_destination.open("wb", buffering=0) as output, _buffer_pool.buffer() as view:
+            if expected_size:
+                _preallocate(output.fileno(), expected_size)
+            bytes_written = _copy_stream_to_output(
+                stream,
+                output,
+                view,
+                max_bytes=upload_config.max_file_size_bytes,
+            )
+            if expected_size and bytes_written != expected_size:
+                output.truncate(bytes_written)
+    except BaseException:
+        # Best-effort cleanup; the write error is the one to report.
+        try:
+            tmp_destination.unlink(missing_ok=True)
+        except OSError:
+            pass
+        raise
+
+    tmp_destination.replace(destination)
+    return bytes_written
 
-    return total_chunks, total_bytes
 
+def _open_chunk_for_merge(chunk_dir: str, index: int) -> int:
+    try:
+        fd = os.open(_chunk_path(chunk_dir, index), os.O_RDONLY | _O_BINARY)
+    except FileNotFoundError:
+        raise FileNotFoundError(f"missing chunk {index}") from None
+    if hasattr(os, "posix_fadvise"):
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+    return fd
 
-def merge_chunks(upload_id: str, total_chunks: int, destination: Path, upload_config) -> int:
-    chunk_dir = upload_config.chunk_dir / upload_id
-    if not chunk_dir.exists():
-        raise FileNotFoundError("chunk directory not found")
+
+def merge_chunks(
+    upload_id: str, total_chunks: int, destination: Path, upload_config, expected_size: int | None = None
+) -> int:
+    chunk_dir = os.path.join(upload_config.chunk_dir, upload_id)
+    try:
+        present = _present_chunk_indexes(chunk_dir)
+    except FileNotFoundError:
+        raise FileNotFoundError("chunk directory not found") from None
+    missing = next((index for index in range(total_chunks) if index not in present), None)
+    if missing is not None:
+        raise FileNotFoundError(f"missing chunk {missing}")
 
     bytes_written = 0
     tmp_destination = destination.with_suffix(destination.suffix + ".tmp")
-    with tmp_destination.open("wb") as output:
+    out_fd = os.open(tmp_destination, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | _O_BINARY, 0o644)
+    in_fd = next_fd = None
+    try:
+        if expected_size:
+            # Reserve the whole file up front so the filesystem can lay it out in few extents.
+            _preallocate(out_fd, min(expected_size, upload_config.max_file_size_bytes))
+        if total_chunks:
+            next_fd = _open_chunk_for_merge(chunk_dir, 0)
         for index in range(total_chunks):
-            chunk_path = _chunk_path(chunk_dir, index)
-            if not chunk_path.exists():
-                raise FileNotFoundError(f"missing chunk {index}")
-            with chunk_path.open("rb") as chunk_file:
-                bytes_written = _copy_stream_to_output(
-                    chunk_file,
-                    output,
-                    read_size=1024 * 1024,
-                    max_bytes=upload_config.max_file_size_bytes,
-                    bytes_written=bytes_written,
-                )
+            in_fd, next_fd = next_fd, None
+            if index + 1 < total_chunks:
+                # Opening the next part early lets its readahead overlap with copying this one.
+                next_fd = _open_chunk_for_merge(chunk_dir, index + 1)
+            part_size = os.fstat(in_fd).st_size
+            if bytes_written + part_size > upload_config.max_file_size_bytes:
+                raise ValueError("file too large")
+            copied = _copy_fd(in_fd, out_fd, part_size)
+            if copied != part_size:
+                raise OSError(errno.EIO, f"short copy of chunk {index}: {copied} of {part_size} bytes")
+            bytes_written += copied
+            os.close(in_fd)
+            in_fd = None
+        if expected_size and bytes_written != expected_size:
+            os.ftruncate(out_fd, bytes_written)
+    except BaseException:
+        for fd in (in_fd, next_fd):
+            if fd is not None:
+                os.close(fd)
+        os.close(out_fd)
+        tmp_destination.unlink(missing_ok=True)
+        raise
+    os.close(out_fd)
 
     tmp_destination.replace(destination)
-    _cleanup_chunk_dir(chunk_dir)
+    shutil.rmtree(chunk_dir)
     return bytes_written
-
@@ -23,6 +23,9 @@ function initializeModules(socket) {
     renderMessage: (_message) => {
       logError("message view unavailable");
     },
+    prependMessages: (_messages) => {
+      logError("message view unavailable");
+    },
     hideFileContextMenu: () => {},
   };
 
@@ -57,8 +60,13 @@ function initializeModules(socket) {
   // Initialize socket pause manager (needed by uploadFlow)
   const socketPause = createSocketPauseManager(socket);
 
+  // Initialize history pager (fed the first cursor by the register ack)
+  const historyPager = createHistoryPager(socket, ui, messageView);
+
   // Initialize login manager (needed by uploadFlow)
-  const loginManager = createLoginManager(socket, ui, t);
+  const loginManager = createLoginManager(socket, ui, t, (response) => {
+    historyPager.reset(response.history_cursor);
+  });
   loginManager.loadCachedUsername(ui);
 
   // Initialize upload flow
@@ -1,7 +1,7 @@
 // Login and registration management
 const REGISTER_ACK_TIMEOUT_MS = 8000;
 
-function createLoginManager(socket, ui, t) {
+function createLoginManager(socket, ui, t, onRegistered = () => {}) {
   let registerInFlight = false;
   let currentUsername = "";
 
@@ -81,6 +81,7 @@ function createLoginManager(socket, ui, t) {
 
       log("register ack", response);
       if (response && response.ok) {
+        onRegistered(response);
         persistUsername(normalized);
         ui.loginInput.value = normalized;
         ui.loginMask.classList.add("hidden");
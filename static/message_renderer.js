@@ -7,7 +7,7 @@
    * - deps.pendingUploads/renderedFileIds/renderedClientMsgIds: de-dup state
    * - deps.getLatestServerCreatedAt/setLatestServerCreatedAt: timeline state access
    * - deps.buildFilePreview(file): preview builder
-   * Returns: { renderMessage(message) }
+   * Returns: { renderMessage(message), prependMessages(messages) }
    */
   function createMessageRenderer(deps) {
     const {
@@ -172,8 +172,37 @@
       }
     }
 
+    function prependMessages(messages) {
+      const fragment = document.createDocumentFragment();
+      messages.forEach((message) => {
+        try {
+          normalizeFileMessage(message);
+          const fileId = message && message.file ? message.file.file_id : null;
+          const clientMsgId = message ? message.client_msg_id : null;
+          if ((fileId && renderedFileIds.has(fileId)) || (clientMsgId && renderedClientMsgIds.has(clientMsgId))) {
+            return;
+          }
+          fragment.appendChild(buildMessageElement(message));
+          if (fileId) {
+            renderedFileIds.add(fileId);
+          }
+          if (clientMsgId) {
+            renderedClientMsgIds.add(clientMsgId);
+          }
+        } catch (error) {
+          logError("prependMessages failed", error);
+        }
+      });
+
+      // Keep the message the user is looking at in place while older ones are added above it.
+      const previousScrollHeight = messageList.scrollHeight;
+      messageList.insertBefore(fragment, messageList.firstChild);
+      messageList.scrollTop += messageList.scrollHeight - previousScrollHeight;
+    }
+
     return {
       renderMessage,
+      prependMessages,
     };
   }
 
@@ -4,7 +4,7 @@
    * Dependency contract:
    * - deps must satisfy both preview and renderer factories.
    * - window.MyFileHelperFilePreview and window.MyFileHelperMessageRenderer must be loaded first.
-   * Returns: { renderMessage(message), hideFileContextMenu() }
+   * Returns: { renderMessage(message), prependMessages(messages), hideFileContextMenu() }
    */
   function createMessageView(deps) {
     const previewModule = window.MyFileHelperFilePreview;
@@ -28,6 +28,7 @@
 
     return {
       renderMessage: renderer.renderMessage,
+      prependMessages: renderer.prependMessages,
       hideFileContextMenu: previewHelpers.hideFileContextMenu,
     };
   }
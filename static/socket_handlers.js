@@ -1,4 +1,57 @@
 // Socket event handlers
+const HISTORY_LOAD_THRESHOLD_PX = 40;
+
+// Register only sends the newest history page; older pages are fetched with
+// "history_page" when the message list is scrolled to the top.
+function createHistoryPager(socket, ui, messageView) {
+  let cursor = null;
+  let loading = false;
+  let generation = 0;
+
+  function fillViewport() {
+    const list = ui.messageList;
+    if (list.clientHeight > 0 && list.scrollHeight <= list.clientHeight) {
+      loadOlder();
+    }
+  }
+
+  function reset(nextCursor) {
+    generation += 1;
+    loading = false;
+    cursor = nextCursor ?? null;
+    fillViewport();
+  }
+
+  function loadOlder() {
+    if (!socket || loading || cursor === null) {
+      return;
+    }
+    loading = true;
+    const requestGeneration = generation;
+    socket.emit("history_page", { before: cursor }, (response) => {
+      if (requestGeneration !== generation) {
+        return;
+      }
+      loading = false;
+      if (!response || !response.ok) {
+        logError("history_page failed", response);
+        return;
+      }
+      cursor = response.cursor ?? null;
+      messageView.prependMessages(response.items || []);
+      fillViewport();
+    });
+  }
+
+  ui.messageList.addEventListener("scroll", () => {
+    if (ui.messageList.scrollTop <= HISTORY_LOAD_THRESHOLD_PX) {
+      loadOlder();
+    }
+  });
+
+  return { reset, loadOlder };
+}
+
 function attachSocketEventListeners(socket, ui, t, loginManager, messageView, socketPause, renderTerminalsFunc) {
   if (!socket) {
     setLoginError(ui, t, t("socketScriptFailed"));
@@ -73,16 +73,19 @@
           : `cm_${Date.now()}_${Math.random().toString(16).slice(2)}`;
       const ui = createUploadItem(file);
       ui.status.textContent = t("initializing");
-      const form = new FormData();
-      form.append("file", file);
-      form.append("client_msg_id", clientMsgId);
-      form.append("chunked", "1");
-      form.append("create_message", "1");
-      form.append("mime_type", file.type || "");
+      // Raw body + query fields: the server streams it straight to disk instead of spooling multipart data.
+      const params = new URLSearchParams({
+        filename: file.name,
+        client_msg_id: clientMsgId,
+        chunked: "1",
+        create_message: "1",
+        mime_type: file.type || "",
+      });
       try {
         const result = await new Promise((resolve, reject) => {
           const xhr = new XMLHttpRequest();
-          xhr.open("POST", "/ui/upload");
+          xhr.open("POST", `/ui/upload?${params.toString()}`);
+          xhr.setRequestHeader("Content-Type", "application/octet-stream");
           xhr.responseType = "json";
           xhr.upload.onprogress = (event) => {
             if (!event.lengthComputable) return;
@@ -99,7 +102,7 @@
           };
           xhr.onerror = () => reject(new Error("upload network error"));
           xhr.onabort = () => reject(new Error("upload aborted"));
-          xhr.send(form);
+          xhr.send(file);
         });
         const ok = result && (result.ok === true || result.code === 0);
         if (!ok) {
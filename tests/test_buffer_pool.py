@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from modules.buffer_pool import BufferPool
+
+
+def test_buffer_pool_reuses_released_buffers() -> None:
+    pool = BufferPool(buffer_size=16, max_buffers=2)
+
+    with pool.buffer() as first:
+        first[:3] = b"abc"
+    with pool.buffer() as second:
+        assert bytes(second[:3]) == b"abc"
+
+    assert pool.get_stats()["pooled_buffers"] == 1
+
+
+def test_buffer_pool_caps_pooled_buffers() -> None:
+    pool = BufferPool(buffer_size=16, max_buffers=1)
+
+    buffers = [pool.acquire() for _ in range(3)]
+    for buffer in buffers:
+        pool.release(buffer)
+
+    assert pool.get_stats()["pooled_buffers"] == 1
+
+
+def test_buffer_pool_drains_after_idle_period() -> None:
+    pool = BufferPool(buffer_size=16, max_buffers=2, idle_seconds=0)
+    pool.release(pool.acquire())
+
+    pool._drain_if_idle()
+
+    assert pool.get_stats()["pooled_buffers"] == 0
@@ -25,6 +25,7 @@ autoChunk:
 
     assert cfg.auto_chunk_enabled is False
     assert cfg.auto_chunk_default_enabled is True
+    assert cfg.max_stored_files == 100000
 
 
 def test_load_server_config_parses_string_booleans(tmp_path, monkeypatch) -> None:
@@ -59,5 +60,7 @@ def test_load_server_config_uses_defaults_for_invalid_yaml(tmp_path, monkeypatch
 
     assert cfg.pagination_default_limit == 50
     assert cfg.socketio_ping_interval == 25
+    assert cfg.socketio_history_limit == 200
+    assert cfg.message_max_history == 10000
     assert cfg.access_control_enabled is False
 
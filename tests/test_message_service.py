@@ -1,6 +1,10 @@
 ﻿from __future__ import annotations
 
+from dataclasses import asdict
+
 from modules.message_service import (
+    append_message,
+    history_page,
     list_messages,
     orchestrate_message_create,
     validate_message_create_payload,
@@ -58,6 +62,27 @@ def test_list_messages_filters_by_since() -> None:
     assert [m.msg_id for m in payload["items"]] == ["2"]
 
 
+def test_list_messages_since_cursor_is_absolute_sequence() -> None:
+    state = AppState(
+        messages=[
+            _msg("1", "2026-03-27T10:00:00Z"),
+            _msg("2", "2026-03-27T10:05:00Z"),
+            _msg("3", "2026-03-27T10:06:00Z"),
+        ]
+    )
+    first, _ = list_messages(state, limit=1, cursor=0, since_raw="2026-03-27T10:03:00Z")
+
+    assert [m.msg_id for m in first["items"]] == ["2"]
+    assert first["total"] == 2
+    # Sequence number of message "3", not its offset (1) in the since-filtered list.
+    assert first["next_cursor"] == "2"
+
+    following, _ = list_messages(state, limit=1, cursor=int(first["next_cursor"]), since_raw="2026-03-27T10:03:00Z")
+
+    assert [m.msg_id for m in following["items"]] == ["3"]
+    assert following["next_cursor"] is None
+
+
 def test_validate_message_create_payload_rejects_non_array_attachment_ids() -> None:
     payload, error = validate_message_create_payload(
         {"text": "hello", "attachment_ids": "bad"},
@@ -102,3 +127,60 @@ def test_orchestrate_message_create_success_text_only() -> None:
     assert len(state.messages) == 1
     assert len(socketio.events) == 1
 
+
+def test_append_message_drops_oldest_beyond_max_messages() -> None:
+    state = AppState(max_messages=2)
+    socketio = DummySocketIO()
+
+    for text in ("one", "two", "three"):
+        append_message(state, socketio, user="u", text=text, kind="text")
+
+    assert [m.text for m in state.messages] == ["two", "three"]
+    assert [p["text"] for p in state.message_payloads] == ["two", "three"]
+    assert history_page(state, limit=10)["items"] == list(state.message_payloads)
+
+
+def test_history_page_cursor_survives_eviction() -> None:
+    state = AppState(max_messages=5)
+    socketio = DummySocketIO()
+    for index in range(5):
+        append_message(state, socketio, user="u", text=str(index), kind="text")
+
+    first = history_page(state, limit=2)
+    assert [p["text"] for p in first["items"]] == ["3", "4"]
+
+    for index in range(5, 7):
+        append_message(state, socketio, user="u", text=str(index), kind="text")
+    older = history_page(state, limit=2, before=first["cursor"])
+
+    # "0" and "1" were evicted; only "2" is left below the cursor, with no repeats.
+    assert [p["text"] for p in older["items"]] == ["2"]
+    assert older["cursor"] is None
+    assert state.messages_evicted == 2
+
+
+def test_list_messages_cursor_survives_eviction() -> None:
+    state = AppState(max_messages=3)
+    socketio = DummySocketIO()
+    for index in range(3):
+        append_message(state, socketio, user="u", text=str(index), kind="text")
+
+    first, _ = list_messages(state, limit=2, cursor=0)
+    assert [m.text for m in first["items"]] == ["0", "1"]
+
+    append_message(state, socketio, user="u", text="3", kind="text")
+    following, _ = list_messages(state, limit=2, cursor=int(first["next_cursor"]))
+
+    assert [m.text for m in following["items"]] == ["2", "3"]
+    assert following["next_cursor"] is None
+
+
+def test_message_payload_matches_asdict_without_deep_copy() -> None:
+    entry = {"file_id": "f1", "original_name": "a.txt"}
+    msg = Message(msg_id="1", user="u", text="t", ts="00:00:00", kind="file", file=entry, attachments=[entry])
+
+    payload = msg.to_payload()
+
+    assert payload == asdict(msg)
+    assert list(payload) == list(asdict(msg))
+    assert payload["file"] is entry
@@ -1,7 +1,9 @@
 ﻿from __future__ import annotations
 from datetime import timezone
 from flask import Flask
-from modules.response_utils import error_response, normalize_bool, ok_response, parse_utc
+import re
+from unittest.mock import patch
+from modules.response_utils import error_response, normalize_bool, ok_response, parse_utc, utc_now_iso, utc_now_iso_ms
 def test_normalize_bool_supports_common_truthy_values() -> None:
     assert normalize_bool("true")
     assert normalize_bool("YES")
@@ -28,3 +30,11 @@ def test_error_response_uses_canonical_error_envelope() -> None:
         response, status = error_response("boom", 400, 12345)
     assert status == 400
     assert response.get_json() == {"code": 12345, "message": "boom", "data": None}
+def test_utc_now_iso_formats_whole_seconds_in_utc() -> None:
+    with patch("modules.response_utils.time.time_ns", return_value=1_774_606_830_987_654_321):
+        assert utc_now_iso() == "2026-03-27T10:20:30Z"
+        assert utc_now_iso_ms() == "2026-03-27T10:20:30.987Z"
+def test_utc_now_iso_round_trips_through_parse_utc() -> None:
+    assert re.fullmatch(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}Z", utc_now_iso())
+    assert re.fullmatch(r"\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{3}Z", utc_now_iso_ms())
+    assert parse_utc(utc_now_iso()) is not None
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import json
 from pathlib import Path
 from types import SimpleNamespace
 
 from flask import Flask
 
 from modules.error_codes import ROUTE_ACCESS_FORBIDDEN, ROUTE_MEDIA_FILE_NOT_FOUND
+from modules.log_routes import stop_client_log_listener
 from modules.routes import is_ip_allowed, register_routes
 from modules.state import AppState
 
@@ -173,7 +175,7 @@ def test_files_index_enabled_returns_html_with_media_links(tmp_path: Path) -> No
     assert "/media/f2?download=1" not in body
 
 
-def test_media_alias_resolves_to_first_sorted_file(tmp_path: Path) -> None:
+def test_media_alias_resolves_to_first_stored_file(tmp_path: Path) -> None:
     app = _make_app(tmp_path, autoindex_enabled=True)
     client = app.test_client()
     state = app.extensions["test_state"]
@@ -184,6 +186,14 @@ def test_media_alias_resolves_to_first_sorted_file(tmp_path: Path) -> None:
     second_file_path = upload_dir / "second.txt"
     second_file_path.write_bytes(b"second-content")
 
+    state.uploaded_files["f1"] = {
+        "file_id": "f1",
+        "stored_name": "first.txt",
+        "original_name": "first.txt",
+        "mime": "text/plain",
+        "size": 13,
+        "uploaded_at": "2026-03-28T01:02:03Z",
+    }
     state.uploaded_files["f2"] = {
         "file_id": "f2",
         "stored_name": "second.txt",
@@ -192,16 +202,119 @@ def test_media_alias_resolves_to_first_sorted_file(tmp_path: Path) -> None:
         "size": 14,
         "uploaded_at": "2026-03-28T01:02:04Z",
     }
-    state.uploaded_files["f1"] = {
-        "file_id": "f1",
-        "stored_name": "first.txt",
-        "original_name": "first.txt",
-        "mime": "text/plain",
-        "size": 13,
+
+    assert client.get("/media/1").get_data() == b"first-content"
+    assert client.get("/media/2").get_data() == b"second-content"
+
+
+def test_media_alias_stays_on_its_file_after_eviction(tmp_path: Path) -> None:
+    app = _make_app(tmp_path, autoindex_enabled=True)
+    client = app.test_client()
+    state = app.extensions["test_state"]
+    upload_dir = app.extensions["test_upload_dir"]
+    state.uploaded_files.capacity = 2
+
+    for file_id in ("a", "b", "c"):
+        (upload_dir / f"{file_id}.txt").write_bytes(file_id.encode())
+        state.uploaded_files[file_id] = {
+            "file_id": file_id,
+            "stored_name": f"{file_id}.txt",
+            "original_name": f"{file_id}.txt",
+            "mime": "text/plain",
+            "size": 1,
+            "uploaded_at": "2026-03-28T01:02:03Z",
+        }
+
+    assert client.get("/media/1").status_code == 404
+    assert client.get("/media/2").get_data() == b"b"
+    assert client.get("/media/3").get_data() == b"c"
+    body = client.get("/files").get_data(as_text=True)
+    assert "/media/1" not in body
+    assert "/media/3" in body
+
+
+def _add_media_file(app: Flask, file_id: str, content: bytes, original_name: str) -> None:
+    state = app.extensions["test_state"]
+    upload_dir = app.extensions["test_upload_dir"]
+    stored_name = f"{file_id}_stored.bin"
+    (upload_dir / stored_name).write_bytes(content)
+    state.uploaded_files[file_id] = {
+        "file_id": file_id,
+        "stored_name": stored_name,
+        "original_name": original_name,
+        "mime": "application/octet-stream",
+        "size": len(content),
         "uploaded_at": "2026-03-28T01:02:03Z",
     }
 
-    response = client.get("/media/1")
+
+def test_media_supports_range_requests(tmp_path: Path) -> None:
+    app = _make_app(tmp_path)
+    _add_media_file(app, "f1", b"0123456789", "digits.bin")
+    client = app.test_client()
+
+    response = client.get("/media/f1", headers={"Range": "bytes=2-5"})
+
+    assert response.status_code == 206
+    assert response.get_data() == b"2345"
+    assert response.headers["Content-Range"] == "bytes 2-5/10"
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+
+def test_media_download_sets_attachment_disposition_and_etag(tmp_path: Path) -> None:
+    app = _make_app(tmp_path)
+    _add_media_file(app, "f1", b"hello", "报告.txt")
+    client = app.test_client()
+
+    response = client.get("/media/f1?download=1&queue=0")
 
     assert response.status_code == 200
-    assert response.get_data() == b"first-content"
+    assert response.get_data() == b"hello"
+    assert response.headers["Content-Length"] == "5"
+    disposition = response.headers["Content-Disposition"]
+    assert disposition.startswith("attachment;")
+    assert "filename*=UTF-8''%E6%8A%A5%E5%91%8A.txt" in disposition
+
+    etag = response.headers["ETag"]
+    cached = client.get("/media/f1?download=1&queue=0", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+
+
+def test_client_log_appends_json_line(tmp_path: Path) -> None:
+    app = _make_app(tmp_path)
+    client = app.test_client()
+
+    response = client.post("/ui/client-log", json={"level": "warn", "args": ["上传失败"]})
+    stop_client_log_listener(tmp_path / "client.log")
+
+    assert response.status_code == 204
+    line = (tmp_path / "client.log").read_text(encoding="utf-8").strip().splitlines()[-1]
+    entry = json.loads(line)
+    assert entry["level"] == "warn"
+    assert entry["args"] == ["上传失败"]
+    assert "上传失败" in line
+
+
+def test_client_log_writes_only_to_own_app_file(tmp_path: Path) -> None:
+    first_dir = tmp_path / "first"
+    second_dir = tmp_path / "second"
+    first_dir.mkdir()
+    second_dir.mkdir()
+    _make_app(first_dir)
+    _make_app(second_dir)
+    # Registering the same path again must replace, not stack, its handler.
+    app = _make_app(second_dir)
+
+    app.test_client().post("/ui/client-log", json={"args": ["once"]})
+    stop_client_log_listener(second_dir / "client.log")
+
+    assert (first_dir / "client.log").read_text(encoding="utf-8") == ""
+    assert len((second_dir / "client.log").read_text(encoding="utf-8").splitlines()) == 1
+
+
+def test_client_log_reregistration_replaces_listener_thread(tmp_path: Path) -> None:
+    first = _make_app(tmp_path).extensions["client_log_listener"]
+    second = _make_app(tmp_path).extensions["client_log_listener"]
+
+    assert first._thread is None
+    assert second._thread is not None and second._thread.is_alive()
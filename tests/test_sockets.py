@@ -7,12 +7,12 @@ from modules.sockets import register_socket_handlers
 from modules.state import AppState
 
 
-def _make_socket_app() -> tuple[Flask, SocketIO, AppState]:
+def _make_socket_app(*, history_limit: int = 200) -> tuple[Flask, SocketIO, AppState]:
     app = Flask(__name__)
     app.config["SECRET_KEY"] = "test-key"
     socketio = SocketIO(app, async_mode="threading")
     state = AppState()
-    register_socket_handlers(socketio, state)
+    register_socket_handlers(socketio, state, history_limit=history_limit)
     return app, socketio, state
 
 
@@ -33,7 +33,7 @@ def test_register_and_disconnect_updates_state() -> None:
 
     ack = client.emit("register", {"username": "alpha"}, callback=True)
 
-    assert ack == {"ok": True}
+    assert ack == {"ok": True, "history_cursor": None}
     assert len(state.clients) == 1
     assert len(state.terminal_sessions) == 1
 
@@ -51,6 +51,48 @@ def test_message_event_ignores_blank_text() -> None:
 
     client.emit("message", {"text": "   "})
 
-    assert state.messages == []
+    assert list(state.messages) == []
     client.disconnect()
 
+
+def test_register_emits_history_of_existing_messages() -> None:
+    app, socketio, _state = _make_socket_app()
+    sender = socketio.test_client(app, flask_test_client=app.test_client())
+    sender.emit("register", {"username": "alpha"}, callback=True)
+    sender.emit("message", {"text": "hello"})
+
+    client = socketio.test_client(app, flask_test_client=app.test_client())
+    client.emit("register", {"username": "beta"}, callback=True)
+    history = [event["args"][0] for event in client.get_received() if event["name"] == "history"]
+
+    assert len(history) == 1
+    assert [m["text"] for m in history[0]] == ["hello"]
+    assert history[0][0]["user"] == "alpha"
+    sender.disconnect()
+    client.disconnect()
+
+
+def test_register_sends_latest_page_and_history_page_returns_older() -> None:
+    app, socketio, _state = _make_socket_app(history_limit=2)
+    sender = socketio.test_client(app, flask_test_client=app.test_client())
+    sender.emit("register", {"username": "alpha"}, callback=True)
+    for text in ("one", "two", "three"):
+        sender.emit("message", {"text": text})
+
+    client = socketio.test_client(app, flask_test_client=app.test_client())
+    ack = client.emit("register", {"username": "beta"}, callback=True)
+    history = next(event["args"][0] for event in client.get_received() if event["name"] == "history")
+
+    assert [m["text"] for m in history] == ["two", "three"]
+    assert ack["history_cursor"] == 1
+
+    page = client.emit("history_page", {"before": ack["history_cursor"]}, callback=True)
+
+    assert page["ok"] is True
+    assert [m["text"] for m in page["items"]] == ["one"]
+    assert page["cursor"] is None
+
+    bad = client.emit("history_page", {}, callback=True)
+    assert bad["ok"] is False
+    sender.disconnect()
+    client.disconnect()
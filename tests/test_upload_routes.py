@@ -95,13 +95,13 @@ def test_upload_maps_too_large_error() -> None:
     assert payload["code"] == 41301
 
 
-def test_upload_maps_merge_verification_error() -> None:
+def test_upload_maps_insufficient_storage_error() -> None:
     app = _make_app()
     client = app.test_client()
 
     with patch(
         "modules.upload_routes.orchestrate_auto_upload",
-        return_value=(None, ("merge verification failed", 500, 50001)),
+        return_value=(None, ("insufficient storage", 507, 50701)),
     ):
         response = client.post(
             "/ui/upload",
@@ -111,8 +111,8 @@ def test_upload_maps_merge_verification_error() -> None:
         )
 
     payload = response.get_json()
-    assert response.status_code == 500
-    assert payload["code"] == 50001
+    assert response.status_code == 507
+    assert payload["code"] == 50701
 
 
 def test_upload_success_response_shape_and_blank_client_msg_id() -> None:
@@ -130,7 +130,7 @@ def test_upload_success_response_shape_and_blank_client_msg_id() -> None:
             "alias_url": "/media/f1?download=1",
             "inline_url": "/media/f1",
         },
-        "upload": {"chunked": True, "chunk_size": 4096},
+        "upload": {"chunked": True},
     }
 
     with patch(
@@ -151,7 +151,6 @@ def test_upload_success_response_shape_and_blank_client_msg_id() -> None:
     assert payload["code"] == 0
     assert payload["message"] == "ok"
     assert payload["data"]["file"]["file_id"] == "f1"
-    assert payload["data"]["upload"]["chunk_size"] == 4096
     assert payload["data"]["upload"]["chunked"] is True
 
     assert orchestrate_mock.call_args.kwargs["client_msg_id"] == ""
@@ -172,7 +171,7 @@ def test_upload_passes_create_message_to_service() -> None:
             "alias_url": "/media/f2?download=1",
             "inline_url": "/media/f2",
         },
-        "upload": {"chunked": True, "chunk_size": 2048},
+        "upload": {"chunked": True},
     }
 
     with patch(
@@ -192,3 +191,42 @@ def test_upload_passes_create_message_to_service() -> None:
     assert payload["code"] == 0
     assert orchestrate_mock.call_args.kwargs["create_message"] is True
 
+
+def test_upload_accepts_raw_octet_stream_body() -> None:
+    app = _make_app()
+    client = app.test_client()
+    captured: dict[str, object] = {}
+
+    def fake_orchestrate(*_args, **kwargs):
+        captured.update(kwargs)
+        captured["body"] = kwargs["upload_stream"].read()
+        return {"file": {"file_id": "f3"}, "upload": {"chunked": True, "chunk_size": 1024}}, None
+
+    with patch("modules.upload_routes.orchestrate_auto_upload", side_effect=fake_orchestrate):
+        response = client.post(
+            "/ui/upload?filename=%E6%8A%A5%E5%91%8A.txt&client_msg_id=cm1&create_message=1&mime_type=text/plain",
+            data=b"raw-bytes",
+            content_type="application/octet-stream",
+        )
+
+    assert response.status_code == 201
+    assert captured["body"] == b"raw-bytes"
+    assert captured["filename"] == "报告.txt"
+    assert captured["client_msg_id"] == "cm1"
+    assert captured["mime"] == "text/plain"
+    assert captured["expected_size"] == len(b"raw-bytes")
+    assert captured["create_message"] is True
+
+
+def test_upload_raw_body_respects_auto_chunk_disabled() -> None:
+    app = _make_app(auto_chunk_enabled=False)
+    client = app.test_client()
+
+    response = client.post(
+        "/ui/upload?filename=a.txt&chunked=1",
+        data=b"abc",
+        content_type="application/octet-stream",
+    )
+
+    assert response.status_code == 400
+    assert response.get_json()["code"] == 40016
@@ -1,23 +1,34 @@
 ﻿from __future__ import annotations
 
+import errno
+import os
+import sys
+from functools import partial
 from io import BytesIO
 from types import SimpleNamespace
 from unittest.mock import patch
 
 import pytest
 
-from modules.error_codes import UPLOAD_EMPTY_FILE, UPLOAD_FILE_TOO_LARGE, UPLOAD_MERGE_VERIFICATION_FAILED
+from modules.error_codes import UPLOAD_EMPTY_FILE, UPLOAD_FILE_TOO_LARGE, UPLOAD_INSUFFICIENT_STORAGE
+from modules.message_service import append_message
 from modules.state import AppState
 from modules.upload_service import map_auto_upload_error, orchestrate_auto_upload, serialize_attachment
 from modules.upload_storage import (
+    _kernel_copy_functions,
     choose_chunk_size,
     create_upload_session,
     merge_chunks,
-    save_stream_as_chunks,
+    save_stream_preallocated,
     save_stream_to_file,
     save_upload_chunk,
 )
-from modules.upload_service import finalize_upload_session, store_auto_uploaded_file
+from modules.upload_service import (
+    finalize_upload_session,
+    remove_stored_file,
+    store_auto_uploaded_file,
+    store_uploaded_file,
+)
 
 
 def _cfg(tmp_path=None, *, max_file_size_bytes: int = 1024 * 1024) -> SimpleNamespace:
@@ -82,12 +93,16 @@ def test_create_upload_session_initializes_session_state(tmp_path) -> None:
     upload_id = payload["upload_id"]
     assert upload_id in sessions
     assert sessions[upload_id]["filename"] == "a.txt"
+    assert sessions[upload_id]["stored_name"] == f"{upload_id}_a.txt"
+    assert sessions[upload_id]["chunk_dir"] == str(cfg.chunk_dir / upload_id)
     assert (cfg.chunk_dir / upload_id).exists()
 
 
 def test_save_upload_chunk_persists_data(tmp_path) -> None:
     cfg = _cfg(tmp_path)
-    sessions = {"u1": {}}
+    chunk_dir = cfg.chunk_dir / "u1"
+    chunk_dir.mkdir()
+    sessions = {"u1": {"chunk_dir": str(chunk_dir)}}
 
     payload = save_upload_chunk(
         cfg,
@@ -119,25 +134,47 @@ def test_save_stream_to_file_rejects_oversize(tmp_path) -> None:
         save_stream_to_file(BytesIO(b"hello"), tmp_path / "file.bin", cfg)
 
 
-def test_save_stream_as_chunks_creates_multiple_parts(tmp_path) -> None:
+def test_save_stream_preallocated_trims_to_written_size(tmp_path) -> None:
     cfg = _cfg(tmp_path)
-    cfg.default_chunk_size_bytes = 4
-    cfg.min_chunk_size_bytes = 1
-    cfg.max_chunk_size_bytes = 8
-    cfg.mem_budget_per_upload_bytes = 8
-
-    total_chunks, total_bytes = save_stream_as_chunks(
-        BytesIO(b"abcdef"),
-        "u2",
-        cfg,
-        {},
-        expected_size=200 * 1024 * 1024,
-    )
+    destination = tmp_path / "file.bin"
+
+    size = save_stream_preallocated(BytesIO(b"abcdef"), destination, cfg, expected_size=64)
+
+    assert size == 6
+    assert destination.read_bytes() == b"abcdef"
+    assert not (tmp_path / "file.bin.tmp").exists()
+
+
+def test_save_stream_preallocated_rejects_oversize_and_removes_partial_output(tmp_path) -> None:
+    cfg = _cfg(tmp_path, max_file_size_bytes=3)
+    destination = cfg.upload_dir / "file.bin"
+
+    with pytest.raises(ValueError, match="file too large"):
+        save_stream_preallocated(BytesIO(b"hello"), destination, cfg)
+    with pytest.raises(ValueError, match="file too large"):
+        save_stream_preallocated(BytesIO(b"hi"), destination, cfg, expected_size=5)
+
+    assert list(cfg.upload_dir.iterdir()) == []
+
 
-    assert total_chunks == 2
-    assert total_bytes == 6
-    assert (cfg.chunk_dir / "u2" / "chunk_000000.part").read_bytes() == b"abcd"
-    assert (cfg.chunk_dir / "u2" / "chunk_000001.part").read_bytes() == b"ef"
+class ShortReadStream:
+    """Stream without readinto that never returns more than three bytes per read."""
+
+    def __init__(self, data: bytes) -> None:
+        self._buffer = BytesIO(data)
+
+    def read(self, size: int = -1) -> bytes:
+        return self._buffer.read(min(size, 3))
+
+
+def test_save_stream_preallocated_reads_streams_without_readinto(tmp_path) -> None:
+    cfg = _cfg(tmp_path)
+    destination = tmp_path / "file.bin"
+
+    size = save_stream_preallocated(ShortReadStream(b"abcdefg"), destination, cfg, expected_size=7)
+
+    assert size == 7
+    assert destination.read_bytes() == b"abcdefg"
 
 
 def test_merge_chunks_merges_and_cleans_up(tmp_path) -> None:
@@ -155,6 +192,19 @@ def test_merge_chunks_merges_and_cleans_up(tmp_path) -> None:
     assert not chunk_dir.exists()
 
 
+def test_merge_chunks_trims_preallocation_to_merged_size(tmp_path) -> None:
+    cfg = _cfg(tmp_path)
+    chunk_dir = cfg.chunk_dir / "u9"
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    (chunk_dir / "chunk_000000.part").write_bytes(b"ab")
+    destination = cfg.upload_dir / "merged.bin"
+
+    size = merge_chunks("u9", 1, destination, cfg, expected_size=8)
+
+    assert size == 2
+    assert destination.read_bytes() == b"ab"
+
+
 def test_merge_chunks_raises_for_missing_chunk(tmp_path) -> None:
     cfg = _cfg(tmp_path)
     chunk_dir = cfg.chunk_dir / "u4"
@@ -164,12 +214,111 @@ def test_merge_chunks_raises_for_missing_chunk(tmp_path) -> None:
     with pytest.raises(FileNotFoundError, match="missing chunk 1"):
         merge_chunks("u4", 2, cfg.upload_dir / "merged.bin", cfg)
 
+    assert list(cfg.upload_dir.iterdir()) == []
+
+
+def test_merge_chunks_reports_missing_chunk_directory(tmp_path) -> None:
+    cfg = _cfg(tmp_path)
+
+    with pytest.raises(FileNotFoundError, match="chunk directory not found"):
+        merge_chunks("absent", 1, cfg.upload_dir / "merged.bin", cfg)
+
+
+def test_merge_chunks_falls_back_to_read_write_copy(tmp_path) -> None:
+    cfg = _cfg(tmp_path)
+    chunk_dir = cfg.chunk_dir / "u6"
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    (chunk_dir / "chunk_000000.part").write_bytes(b"ab")
+    (chunk_dir / "chunk_000001.part").write_bytes(b"cd")
+    destination = cfg.upload_dir / "merged.bin"
+
+    with patch("modules.upload_storage._kernel_copy_functions", return_value=[]):
+        size = merge_chunks("u6", 2, destination, cfg)
+
+    assert size == 4
+    assert destination.read_bytes() == b"abcd"
+
+
+def test_merge_chunks_falls_back_when_sendfile_rejects_file_output(tmp_path, monkeypatch) -> None:
+    cfg = _cfg(tmp_path)
+    chunk_dir = cfg.chunk_dir / "u9"
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    (chunk_dir / "chunk_000000.part").write_bytes(b"ab")
+    (chunk_dir / "chunk_000001.part").write_bytes(b"cd")
+    destination = cfg.upload_dir / "merged.bin"
+
+    def sendfile_to_non_socket(out_fd, in_fd, offset, count):
+        raise OSError(errno.ENOTSOCK, "Socket operation on non-socket")
+
+    monkeypatch.delattr(os, "copy_file_range", raising=False)
+    monkeypatch.setattr(os, "sendfile", sendfile_to_non_socket, raising=False)
+    monkeypatch.setattr(sys, "platform", "linux")
+
+    size = merge_chunks("u9", 2, destination, cfg)
+
+    assert size == 4
+    assert destination.read_bytes() == b"abcd"
+
+
+def test_merge_chunks_finishes_short_kernel_copy_with_read_write(tmp_path) -> None:
+    cfg = _cfg(tmp_path)
+    chunk_dir = cfg.chunk_dir / "u10"
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    (chunk_dir / "chunk_000000.part").write_bytes(b"abcd")
+    destination = cfg.upload_dir / "merged.bin"
+
+    def copy_one_byte_then_stop(in_fd, out_fd, count):
+        if os.lseek(in_fd, 0, os.SEEK_CUR):
+            return 0
+        return os.write(out_fd, os.read(in_fd, 1))
+
+    with patch("modules.upload_storage._kernel_copy_functions", return_value=[copy_one_byte_then_stop]):
+        size = merge_chunks("u10", 1, destination, cfg)
+
+    assert size == 4
+    assert destination.read_bytes() == b"abcd"
+
+
+def test_merge_chunks_rejects_short_chunk_copy(tmp_path) -> None:
+    cfg = _cfg(tmp_path)
+    chunk_dir = cfg.chunk_dir / "u11"
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    (chunk_dir / "chunk_000000.part").write_bytes(b"abcd")
+    destination = cfg.upload_dir / "merged.bin"
+
+    with patch("modules.upload_storage._copy_fd", return_value=3), pytest.raises(OSError, match="short copy"):
+        merge_chunks("u11", 1, destination, cfg)
+
+    assert not destination.exists()
+    assert list(cfg.upload_dir.iterdir()) == []
+
+
+def test_kernel_copy_functions_skip_sendfile_outside_linux(monkeypatch) -> None:
+    monkeypatch.delattr(os, "copy_file_range", raising=False)
+    monkeypatch.setattr(sys, "platform", "darwin")
+
+    assert _kernel_copy_functions() == []
+
+
+def test_merge_chunks_rejects_oversize_and_removes_partial_output(tmp_path) -> None:
+    cfg = _cfg(tmp_path, max_file_size_bytes=3)
+    chunk_dir = cfg.chunk_dir / "u7"
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+    (chunk_dir / "chunk_000000.part").write_bytes(b"ab")
+    (chunk_dir / "chunk_000001.part").write_bytes(b"cd")
+
+    with pytest.raises(ValueError, match="file too large"):
+        merge_chunks("u7", 2, cfg.upload_dir / "merged.bin", cfg)
+
+    assert list(cfg.upload_dir.iterdir()) == []
+
 
 def test_finalize_upload_session_merges_and_stores_entry(tmp_path) -> None:
     cfg = _cfg(tmp_path)
     sessions = {
         "u5": {
             "filename": "hello.txt",
+            "stored_name": "u5_hello.txt",
             "size": 4,
             "mime": "text/plain",
             "client_msg_id": "abc",
@@ -193,9 +342,8 @@ def test_store_auto_uploaded_file_direct_success(tmp_path) -> None:
     cfg = _cfg(tmp_path)
     uploaded_files: dict[str, dict] = {}
 
-    entry, chunk_size = store_auto_uploaded_file(
+    entry = store_auto_uploaded_file(
         cfg,
-        {},
         uploaded_files,
         upload_stream=BytesIO(b"hello"),
         filename="hello.txt",
@@ -206,31 +354,28 @@ def test_store_auto_uploaded_file_direct_success(tmp_path) -> None:
 
     assert entry["original_name"] == "hello.txt"
     assert (cfg.upload_dir / entry["stored_name"]).read_bytes() == b"hello"
-    assert chunk_size >= cfg.min_chunk_size_bytes
 
 
 def test_store_auto_uploaded_file_chunked_success(tmp_path) -> None:
     cfg = _cfg(tmp_path)
-    cfg.default_chunk_size_bytes = 4
-    cfg.min_chunk_size_bytes = 1
-    cfg.max_chunk_size_bytes = 8
-    cfg.mem_budget_per_upload_bytes = 8
     uploaded_files: dict[str, dict] = {}
 
-    entry, _chunk_size = store_auto_uploaded_file(
-        cfg,
-        {},
-        uploaded_files,
-        upload_stream=BytesIO(b"abcdef"),
-        filename="hello.txt",
-        mime="text/plain",
-        client_msg_id="abc",
-        chunked=True,
-        expected_size=200 * 1024 * 1024,
-    )
+    with patch("modules.upload_service.merge_chunks") as merge_mock:
+        entry = store_auto_uploaded_file(
+            cfg,
+            uploaded_files,
+            upload_stream=BytesIO(b"abcdef"),
+            filename="hello.txt",
+            mime="text/plain",
+            client_msg_id="abc",
+            chunked=True,
+            expected_size=6,
+        )
 
     assert (cfg.upload_dir / entry["stored_name"]).read_bytes() == b"abcdef"
+    assert entry["size"] == 6
     assert not any(cfg.chunk_dir.iterdir())
+    merge_mock.assert_not_called()
 
 
 def test_store_auto_uploaded_file_empty_file_cleans_up(tmp_path) -> None:
@@ -240,7 +385,6 @@ def test_store_auto_uploaded_file_empty_file_cleans_up(tmp_path) -> None:
         store_auto_uploaded_file(
             cfg,
             {},
-            {},
             upload_stream=BytesIO(b""),
             filename="empty.txt",
             mime="text/plain",
@@ -261,7 +405,12 @@ def test_serialize_attachment_uses_fallback_urls() -> None:
 def test_map_auto_upload_error_maps_supported_exceptions() -> None:
     assert map_auto_upload_error(EOFError())[2] == UPLOAD_EMPTY_FILE
     assert map_auto_upload_error(ValueError())[2] == UPLOAD_FILE_TOO_LARGE
-    assert map_auto_upload_error(RuntimeError())[2] == UPLOAD_MERGE_VERIFICATION_FAILED
+    assert map_auto_upload_error(OSError(errno.ENOSPC, "no space"))[2] == UPLOAD_INSUFFICIENT_STORAGE
+
+
+def test_map_auto_upload_error_reraises_other_os_errors() -> None:
+    with pytest.raises(PermissionError):
+        map_auto_upload_error(PermissionError(errno.EACCES, "denied"))
 
 
 def test_orchestrate_auto_upload_returns_service_error_for_empty_file(tmp_path) -> None:
@@ -298,7 +447,7 @@ def test_orchestrate_auto_upload_success_with_message_creation(tmp_path) -> None
     state = AppState()
 
     with (
-        patch("modules.upload_service.store_auto_uploaded_file", return_value=(fake_entry, 4096)),
+        patch("modules.upload_service.store_auto_uploaded_file", return_value=fake_entry),
         patch("modules.upload_service.append_message") as append_mock,
     ):
         result, error = orchestrate_auto_upload(
@@ -317,7 +466,66 @@ def test_orchestrate_auto_upload_success_with_message_creation(tmp_path) -> None
     assert error is None
     assert result is not None
     assert result["file"]["file_id"] == "f1"
-    assert result["upload"]["chunk_size"] == 4096
+    assert result["upload"] == {"chunked": True}
     append_mock.assert_called_once()
 
 
+def test_uploaded_files_lru_evicts_oldest_and_removes_stored_file(tmp_path) -> None:
+    cfg = _cfg(tmp_path)
+    state = AppState(max_uploaded_files=2)
+    state.uploaded_files.on_evict = partial(remove_stored_file, cfg)
+    for file_id in ("a", "b", "c"):
+        (cfg.upload_dir / f"{file_id}.bin").write_bytes(b"x")
+        store_uploaded_file(
+            file_id=file_id,
+            original_name=f"{file_id}.bin",
+            stored_name=f"{file_id}.bin",
+            size=1,
+            mime="application/octet-stream",
+            client_msg_id="",
+            uploaded_files=state.uploaded_files,
+        )
+        if file_id == "b":
+            # A lookup counts as use, so "a" becomes the eviction candidate over "b".
+            assert state.uploaded_files.get("a") is not None
+
+    assert list(state.uploaded_files) == ["a", "c"]
+    assert not (cfg.upload_dir / "b.bin").exists()
+    assert (cfg.upload_dir / "a.bin").exists()
+
+
+def test_uploaded_files_lru_keeps_files_linked_from_retained_messages(tmp_path) -> None:
+    state = AppState(max_messages=2, max_uploaded_files=1)
+    socketio = DummySocketIO()
+    evicted: list[str] = []
+    state.uploaded_files.on_evict = lambda entry: evicted.append(entry["file_id"])
+
+    state.uploaded_files["a"] = {"file_id": "a"}
+    append_message(state, socketio, user="u", text="", kind="file", attachments=[state.uploaded_files["a"]])
+    state.uploaded_files["b"] = {"file_id": "b"}
+
+    assert evicted == []
+    assert set(state.uploaded_files) == {"a", "b"}
+
+    # Two text messages push the one linking "a" out of history, which unpins it.
+    append_message(state, socketio, user="u", text="one", kind="text")
+    append_message(state, socketio, user="u", text="two", kind="text")
+    state.uploaded_files["c"] = {"file_id": "c"}
+
+    assert evicted == ["a", "b"]
+    assert list(state.uploaded_files) == ["c"]
+
+
+def test_uploaded_files_lru_leaves_pinned_entries_in_place() -> None:
+    pinned = {"a"}
+    state = AppState(max_uploaded_files=1)
+    state.uploaded_files.is_pinned = lambda file_id: file_id in pinned
+    evicted: list[str] = []
+    state.uploaded_files.on_evict = lambda entry: evicted.append(entry["file_id"])
+
+    for file_id in ("a", "b", "c"):
+        state.uploaded_files[file_id] = {"file_id": file_id}
+
+    assert evicted == ["b"]
+    assert list(state.uploaded_files) == ["a", "c"]
+    assert state.uploaded_files.alias_of("c") == 3